@@ -1,260 +1,500 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import os
-
-st.set_page_config(page_title="Executive Customer Segmentation Dashboard", layout="wide")
-
-st.title("📊 Executive Customer Segmentation Dashboard")
-st.markdown("RFM-Based Behavioral Analytics | Executive Intelligence Dashboard")
-
-# =====================================================
-# AUTO LOAD DEFAULT DATASET
-# =====================================================
-@st.cache_data
-def load_default_data():
-    try:
-        file_path = os.path.join(os.getcwd(), "data.csv")
-        if os.path.exists(file_path):
-            return pd.read_csv(file_path, encoding="ISO-8859-1")
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Error loading default dataset: {e}")
-        return None
-
-uploaded_file = st.file_uploader("Upload your dataset (optional)", type=["csv"])
-
-if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file, encoding="ISO-8859-1")
-    st.success("Custom dataset loaded successfully!")
-else:
-    df = load_default_data()
-    if df is not None:
-        st.info("Using default dataset (data.csv)")
-    else:
-        st.error("No dataset found. Please upload a CSV file.")
-        st.stop()
-
-# =====================================================
-# STANDARDIZE COLUMN NAMES (SUPERSTORE SUPPORT)
-# =====================================================
-df.columns = df.columns.str.strip()
-
-column_mapping = {
-    "Customer ID": "CustomerID",
-    "Order Date": "InvoiceDate",
-    "Order ID": "InvoiceNo",
-    "Sales": "Monetary"
-}
-
-df = df.rename(columns=column_mapping)
-
-required_columns = ["CustomerID", "InvoiceDate", "InvoiceNo", "Monetary"]
-
-missing_cols = [col for col in required_columns if col not in df.columns]
-
-if missing_cols:
-    st.error(f"Missing required columns: {missing_cols}")
-    st.stop()
-
-# =====================================================
-# DATA PREPARATION
-# =====================================================
-df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"], errors="coerce")
-df = df.dropna(subset=["InvoiceDate"])
-
-snapshot_date = df["InvoiceDate"].max() + pd.Timedelta(days=1)
-
-rfm = df.groupby("CustomerID").agg({
-    "InvoiceDate": lambda x: (snapshot_date - x.max()).days,
-    "InvoiceNo": "nunique",
-    "Monetary": "sum"
-}).reset_index()
-
-rfm.columns = ["CustomerID", "Recency", "Frequency", "Monetary"]
-
-# =====================================================
-# SAFE RFM SCORING
-# =====================================================
-def safe_qcut(series, labels):
-    try:
-        return pd.qcut(series, 4, labels=labels, duplicates="drop")
-    except:
-        return pd.Series([labels[0]] * len(series))
-
-rfm["R_Score"] = safe_qcut(rfm["Recency"], [4,3,2,1])
-rfm["F_Score"] = safe_qcut(rfm["Frequency"].rank(method="first"), [1,2,3,4])
-rfm["M_Score"] = safe_qcut(rfm["Monetary"], [1,2,3,4])
-
-rfm["RFM_Score"] = (
-    rfm["R_Score"].astype(str) +
-    rfm["F_Score"].astype(str) +
-    rfm["M_Score"].astype(str)
-)
-
-# =====================================================
-# SEGMENT LOGIC
-# =====================================================
-def segment_customer(score):
-    if score in ["444","443","434","433"]:
-        return "Champions"
-    elif score in ["344","343","334"]:
-        return "Loyal Customers"
-    elif score in ["244","243","234"]:
-        return "Potential Loyalist"
-    elif score in ["144","143"]:
-        return "New Customers"
-    elif score in ["111","112","121"]:
-        return "At Risk"
-    else:
-        return "Others"
-
-rfm["Segment"] = rfm["RFM_Score"].apply(segment_customer)
-
-# =====================================================
-# SIDEBAR FILTERS
-# =====================================================
-st.sidebar.header("🔍 Filters")
-
-segment_options = sorted(rfm["Segment"].unique())
-
-selected_segment = st.sidebar.selectbox(
-    "Select Segment",
-    options=["All"] + segment_options
-)
-
-if selected_segment != "All":
-    filtered_rfm = rfm[rfm["Segment"] == selected_segment]
-else:
-    filtered_rfm = rfm
-
-# =====================================================
-# KPIs
-# =====================================================
-st.subheader("📌 Key Performance Indicators")
-
-col1, col2, col3, col4 = st.columns(4)
-
-col1.metric("Total Customers", filtered_rfm["CustomerID"].nunique())
-col2.metric("Avg Recency (Days)", round(filtered_rfm["Recency"].mean(), 1))
-col3.metric("Avg Frequency", round(filtered_rfm["Frequency"].mean(), 1))
-col4.metric("Total Revenue", f"${round(filtered_rfm['Monetary'].sum(),2):,}")
-
-# =====================================================
-# REVENUE TREND OVER TIME (Upgrade 1)
-# =====================================================
-st.subheader("📈 Revenue Trend Over Time")
-
-monthly_revenue = df.copy()
-monthly_revenue["Month"] = monthly_revenue["InvoiceDate"].dt.to_period("M")
-monthly_revenue = monthly_revenue.groupby("Month")["Monetary"].sum().reset_index()
-monthly_revenue["Month"] = monthly_revenue["Month"].astype(str)
-
-fig_trend = px.line(
-    monthly_revenue,
-    x="Month",
-    y="Monetary",
-    title="Monthly Revenue Trend"
-)
-
-st.plotly_chart(fig_trend, use_container_width=True)
-
-# =====================================================
-# SEGMENT DISTRIBUTION
-# =====================================================
-st.subheader("📊 Customer Segment Distribution")
-
-segment_counts = filtered_rfm["Segment"].value_counts().reset_index()
-segment_counts.columns = ["Segment", "Count"]
-
-fig1 = px.bar(
-    segment_counts,
-    x="Segment",
-    y="Count",
-    color="Segment",
-    title="Customer Count by Segment"
-)
-
-st.plotly_chart(fig1, use_container_width=True)
-
-# =====================================================
-# SEGMENT REVENUE CONTRIBUTION (Upgrade 2)
-# =====================================================
-st.subheader("💰 Segment Revenue Contribution")
-
-segment_revenue = rfm.groupby("Segment")["Monetary"].sum().reset_index()
-
-fig_pie = px.pie(
-    segment_revenue,
-    names="Segment",
-    values="Monetary",
-    title="Revenue Contribution by Segment"
-)
-
-st.plotly_chart(fig_pie, use_container_width=True)
-
-# =====================================================
-# RFM SCATTER
-# =====================================================
-st.subheader("📈 RFM Scatter Analysis")
-
-fig2 = px.scatter(
-    filtered_rfm,
-    x="Recency",
-    y="Monetary",
-    size="Frequency",
-    color="Segment",
-    hover_data=["CustomerID"],
-    title="Recency vs Monetary (Bubble Size = Frequency)"
-)
-
-st.plotly_chart(fig2, use_container_width=True)
-
-# =====================================================
-# TOP CUSTOMERS
-# =====================================================
-st.subheader("🏆 Top 10 High-Value Customers")
-
-top_customers = filtered_rfm.sort_values("Monetary", ascending=False).head(10)
-st.dataframe(top_customers, use_container_width=True)
-
-# =====================================================
-# AUTO BUSINESS INSIGHTS (Upgrade 3)
-# =====================================================
-st.subheader("🧠 Strategic Insights")
-
-total_revenue = rfm["Monetary"].sum()
-
-champions_revenue = rfm[rfm["Segment"] == "Champions"]["Monetary"].sum()
-champions_percent = (champions_revenue / total_revenue) * 100 if total_revenue > 0 else 0
-
-at_risk_count = rfm[rfm["Segment"] == "At Risk"]["CustomerID"].nunique()
-
-top10_percent = (
-    rfm.sort_values("Monetary", ascending=False)
-       .head(10)["Monetary"].sum() / total_revenue * 100
-    if total_revenue > 0 else 0
-)
-
-st.markdown(f"""
-- Champions contribute **{champions_percent:.2f}%** of total revenue.
-- There are **{at_risk_count} customers** classified as At Risk.
-- Top 10 customers generate **{top10_percent:.2f}%** of total revenue.
-""")
-
-# =====================================================
-# DOWNLOAD
-# =====================================================
-csv = filtered_rfm.to_csv(index=False).encode("utf-8")
-
-st.download_button(
-    label="Download Filtered Data",
-    data=csv,
-    file_name="filtered_rfm.csv",
-    mime="text/csv"
-)
-
-st.markdown("---")
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import hashlib
+import io
+import os
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+st.set_page_config(page_title="Executive Customer Segmentation Dashboard", layout="wide")
+
+st.title("📊 Executive Customer Segmentation Dashboard")
+st.markdown("RFM-Based Behavioral Analytics | Executive Intelligence Dashboard")
+
+# =====================================================
+# STANDARDIZE COLUMN NAMES (SUPERSTORE SUPPORT)
+# =====================================================
+column_mapping = {
+    "Customer ID": "CustomerID",
+    "Order Date": "InvoiceDate",
+    "Order ID": "InvoiceNo",
+    "Sales": "Monetary"
+}
+
+required_columns = ["CustomerID", "InvoiceDate", "InvoiceNo", "Monetary"]
+
+csv_dtypes = {
+    "Customer ID": "string",
+    "CustomerID": "string",
+    "Order ID": "string",
+    "InvoiceNo": "string"
+}
+
+def read_dataset(file_bytes):
+    try:
+        return pd.read_csv(
+            io.BytesIO(file_bytes),
+            encoding="ISO-8859-1",
+            engine="pyarrow",
+            dtype=csv_dtypes
+        )
+    except Exception:
+        # pyarrow missing or unable to parse this file: use the default parser
+        return pd.read_csv(io.BytesIO(file_bytes), encoding="ISO-8859-1")
+
+class MissingColumnsError(ValueError):
+    pass
+
+def prepare_data(df):
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns=column_mapping)
+
+    missing_cols = [col for col in required_columns if col not in df.columns]
+
+    if missing_cols:
+        raise MissingColumnsError(f"Missing required columns: {missing_cols}")
+
+    # Only the RFM inputs are kept, so the cached frames and the Parquet
+    # copy don't carry the dataset's other (mostly string) columns.
+    df = df[required_columns].copy()
+
+    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"], errors="coerce")
+    df = df.dropna(subset=["InvoiceDate"])
+
+    # Categorical IDs group on int codes; sales stay float64 so customer
+    # totals keep exact cents.
+    df["CustomerID"] = df["CustomerID"].astype("category")
+
+    # Frequency only needs distinct orders, so order IDs are reduced to
+    # int32 codes; missing IDs (-1) are masked so they are still not counted.
+    invoice_codes = pd.factorize(df["InvoiceNo"])[0].astype(np.int32)
+    df["InvoiceNo"] = pd.arrays.IntegerArray(invoice_codes, invoice_codes < 0)
+
+    return df
+
+# =====================================================
+# AUTO LOAD DEFAULT DATASET
+# =====================================================
+# The prepared frame is kept in a Parquet file next to data.csv so cold
+# starts skip CSV tokenizing and date parsing until data.csv (or this
+# script, which defines the preparation) changes.
+@st.cache_data
+def load_default_data():
+    try:
+        file_path = os.path.join(os.getcwd(), "data.csv")
+        if os.path.exists(file_path):
+            cache_path = file_path + ".parquet"
+            source_mtime = max(os.path.getmtime(file_path), os.path.getmtime(__file__))
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= source_mtime:
+                try:
+                    return pd.read_parquet(cache_path, engine="pyarrow")
+                except Exception:
+                    pass  # unreadable copy: rebuild it from the CSV below
+
+            with open(file_path, "rb") as f:
+                df = prepare_data(read_dataset(f.read()))
+
+            # Written under a temporary name and moved into place, so an
+            # interrupted write never leaves a truncated copy to be read.
+            tmp_path = cache_path + ".tmp"
+            try:
+                df.to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass  # read-only deployment: keep serving from the CSV
+            return df
+        else:
+            return None
+    except MissingColumnsError:
+        raise  # reported by the caller like an upload
+    except Exception as e:
+        st.error(f"Error loading default dataset: {e}")
+        return None
+
+# Uploads are cached under a digest of their contents (the bytes themselves
+# are not hashed by Streamlit), so re-uploading the same file hits the cache.
+# The cache is shared by all sessions, so only the latest few are kept.
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_uploaded_data(data_key, _file_bytes):
+    return prepare_data(read_dataset(_file_bytes))
+
+uploaded_file = st.file_uploader("Upload your dataset (optional)", type=["csv"])
+
+if uploaded_file is not None:
+    file_bytes = uploaded_file.getvalue()
+    data_key = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    try:
+        df = load_uploaded_data(data_key, file_bytes)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    st.success("Custom dataset loaded successfully!")
+else:
+    data_key = "data.csv"
+    try:
+        df = load_default_data()
+    except MissingColumnsError as e:
+        st.error(str(e))
+        st.stop()
+    if df is not None:
+        st.info("Using default dataset (data.csv)")
+    else:
+        st.error("No dataset found. Please upload a CSV file.")
+        st.stop()
+
+# =====================================================
+# SAFE RFM SCORING
+# =====================================================
+def quartile_edges(values):
+    return np.quantile(values, [0.25, 0.5, 0.75])
+
+def quartile_score(values, reverse=False):
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.empty(0, dtype=np.int8)
+    edges = quartile_edges(values)
+    scores = np.searchsorted(edges, values, side="left").astype(np.int8) + 1
+    return 5 - scores if reverse else scores
+
+# =====================================================
+# SEGMENT LOGIC
+# =====================================================
+SEGMENT_MAP = {
+    **dict.fromkeys([444, 443, 434, 433], "Champions"),
+    **dict.fromkeys([344, 343, 334], "Loyal Customers"),
+    **dict.fromkeys([244, 243, 234], "Potential Loyalist"),
+    **dict.fromkeys([144, 143], "New Customers"),
+    **dict.fromkeys([111, 112, 121], "At Risk"),
+}
+
+SEGMENT_LABELS = sorted({*SEGMENT_MAP.values(), "Others"})
+
+# Segment code for every (R, F, M) triple, indexed by R*25 + F*5 + M
+SEGMENT_TABLE = np.full(125, SEGMENT_LABELS.index("Others"), dtype=np.int8)
+for score, label in SEGMENT_MAP.items():
+    SEGMENT_TABLE[score // 100 * 25 + score // 10 % 10 * 5 + score % 10] = SEGMENT_LABELS.index(label)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _edges_below(edges, value):
+        count = 0
+        for edge in edges:
+            if edge < value:
+                count += 1
+        return count
+
+    @njit(cache=True)
+    def _score_and_segment(recency, frequency, monetary, r_edges, f_edges, m_edges, segment_table):
+        n = recency.shape[0]
+        r_scores = np.empty(n, np.int8)
+        f_scores = np.empty(n, np.int8)
+        m_scores = np.empty(n, np.int8)
+        segments = np.empty(n, np.int8)
+        for i in range(n):
+            r = 4 - _edges_below(r_edges, recency[i])
+            f = 1 + _edges_below(f_edges, frequency[i])
+            m = 1 + _edges_below(m_edges, monetary[i])
+            r_scores[i] = r
+            f_scores[i] = f
+            m_scores[i] = m
+            segments[i] = segment_table[r * 25 + f * 5 + m]
+        return r_scores, f_scores, m_scores, segments
+
+def score_and_segment(rfm):
+    recency = rfm["Recency"].to_numpy()
+    monetary = rfm["Monetary"].to_numpy()
+
+    # Ordinal rank (ties broken by position, like rank(method="first"))
+    # from one stable sort and a scatter
+    frequency = np.empty(len(rfm), dtype=np.int32)
+    frequency[np.argsort(rfm["Frequency"].to_numpy(), kind="stable")] = np.arange(1, len(rfm) + 1)
+
+    if NUMBA_AVAILABLE and len(rfm) > 0:
+        r, f, m, codes = _score_and_segment(
+            recency, frequency, monetary,
+            quartile_edges(recency), quartile_edges(frequency), quartile_edges(monetary),
+            SEGMENT_TABLE
+        )
+    else:
+        r = quartile_score(recency, reverse=True)
+        f = quartile_score(frequency)
+        m = quartile_score(monetary)
+        codes = SEGMENT_TABLE[r.astype(np.intp) * 25 + f * 5 + m]
+
+    rfm["R_Score"] = r
+    rfm["F_Score"] = f
+    rfm["M_Score"] = m
+    rfm["RFM_Score"] = r.astype(np.int16) * 100 + f * 10 + m
+    rfm["Segment"] = pd.Categorical.from_codes(codes, categories=SEGMENT_LABELS).remove_unused_categories()
+    return rfm
+
+# =====================================================
+# RFM PIPELINE (CACHED PER DATASET)
+# =====================================================
+# Widget interactions rerun the whole script; everything up to the
+# segmented RFM table only depends on the dataset, so it is cached under
+# the dataset key and reused across reruns.
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_rfm(data_key, _df):
+    snapshot_date = _df["InvoiceDate"].max() + pd.Timedelta(days=1)
+
+    # Customers stay in ID order: the Frequency rank breaks ties by position,
+    # so segments must not depend on the CSV's row order.
+    rfm = _df.groupby("CustomerID", observed=True).agg(
+        LastDate=("InvoiceDate", "max"),
+        Frequency=("InvoiceNo", "nunique"),
+        Monetary=("Monetary", "sum")
+    ).reset_index()
+
+    rfm.insert(1, "Recency", (snapshot_date - rfm.pop("LastDate")).dt.days.astype("int32"))
+
+    rfm = score_and_segment(rfm)
+
+    # Per-segment partial sums; any segment selection is answered by
+    # indexing or summing these few rows instead of rescanning rfm.
+    segment_stats = rfm.groupby("Segment", observed=True, sort=False).agg(
+        Customers=("CustomerID", "count"),
+        Recency=("Recency", "sum"),
+        Frequency=("Frequency", "sum"),
+        Monetary=("Monetary", "sum")
+    )
+
+    # Row positions of each segment (and of "All"), so a filter change is a
+    # positional take rather than a comparison over the whole Segment column.
+    segment_rows = rfm.groupby("Segment", observed=True, sort=False).indices
+    segment_rows["All"] = np.arange(len(rfm))
+
+    segment_counts = segment_stats["Customers"].sort_values(ascending=False).reset_index()
+    segment_counts.columns = ["Segment", "Count"]
+
+    segment_revenue = segment_stats["Monetary"].reset_index()
+
+    total_revenue = segment_stats["Monetary"].sum()
+    champions_revenue = segment_stats["Monetary"].get("Champions", 0)
+    top10_revenue = rfm["Monetary"].nlargest(10).sum()
+
+    insights = {
+        "champions_percent": champions_revenue / total_revenue * 100 if total_revenue > 0 else 0,
+        "at_risk_count": int(segment_stats["Customers"].get("At Risk", 0)),
+        "top10_percent": top10_revenue / total_revenue * 100 if total_revenue > 0 else 0
+    }
+
+    # Month codes are offsets from the first month, so the trend is one
+    # bincount; months without any invoices are left out and blank sales
+    # count as zero, as in a groupby sum.
+    month = _df["InvoiceDate"].to_numpy().astype("datetime64[M]").astype("int64")
+    first_month = month.min() if len(month) else 0
+    month_idx = month - first_month
+    revenue_by_month = np.bincount(month_idx, weights=np.nan_to_num(_df["Monetary"].to_numpy()))
+    month_present = np.flatnonzero(np.bincount(month_idx))
+    monthly_revenue = pd.DataFrame({
+        "Month": (first_month + month_present).astype("datetime64[M]").astype(str),
+        "Monetary": revenue_by_month[month_present]
+    })
+
+    return rfm, monthly_revenue, segment_stats, segment_rows, segment_counts, segment_revenue, insights
+
+(
+    rfm, monthly_revenue, segment_stats, segment_rows,
+    segment_counts, segment_revenue, insights
+) = build_rfm(data_key, df)
+
+# =====================================================
+# SIDEBAR FILTERS
+# =====================================================
+st.sidebar.header("🔍 Filters")
+
+segment_options = rfm["Segment"].cat.categories.tolist()
+
+selected_segment = st.sidebar.selectbox(
+    "Select Segment",
+    options=["All"] + segment_options
+)
+
+# Only the row positions of the selection are kept; the cached consumers
+# below gather the columns they need, so no filtered frame is built per rerun.
+selected_rows = segment_rows[selected_segment]
+
+# =====================================================
+# KPIs
+# =====================================================
+st.subheader("📌 Key Performance Indicators")
+
+if selected_segment != "All":
+    kpis = segment_stats.loc[selected_segment]
+else:
+    kpis = segment_stats.sum()
+
+col1, col2, col3, col4 = st.columns(4)
+
+col1.metric("Total Customers", int(kpis["Customers"]))
+col2.metric("Avg Recency (Days)", round(kpis["Recency"] / kpis["Customers"], 1))
+col3.metric("Avg Frequency", round(kpis["Frequency"] / kpis["Customers"], 1))
+col4.metric("Total Revenue", f"${round(kpis['Monetary'],2):,}")
+
+# =====================================================
+# REVENUE TREND OVER TIME (Upgrade 1)
+# =====================================================
+# Figures only depend on the dataset and the selected segment, so the
+# built objects are kept with st.cache_resource and reused across reruns.
+st.subheader("📈 Revenue Trend Over Time")
+
+@st.cache_resource(max_entries=2)
+def trend_figure(data_key, _monthly_revenue):
+    return px.line(
+        _monthly_revenue,
+        x="Month",
+        y="Monetary",
+        title="Monthly Revenue Trend"
+    )
+
+fig_trend = trend_figure(data_key, monthly_revenue)
+
+st.plotly_chart(fig_trend, use_container_width=True, key="monthly_trend")
+
+# =====================================================
+# SEGMENT DISTRIBUTION
+# =====================================================
+st.subheader("📊 Customer Segment Distribution")
+
+@st.cache_resource(max_entries=8)
+def segment_count_figure(data_key, segment, _segment_counts):
+    if segment != "All":
+        _segment_counts = _segment_counts[_segment_counts["Segment"] == segment]
+
+    return px.bar(
+        _segment_counts,
+        x="Segment",
+        y="Count",
+        color="Segment",
+        title="Customer Count by Segment"
+    )
+
+fig1 = segment_count_figure(data_key, selected_segment, segment_counts)
+
+st.plotly_chart(fig1, use_container_width=True, key="seg_count")
+
+# =====================================================
+# SEGMENT REVENUE CONTRIBUTION (Upgrade 2)
+# =====================================================
+st.subheader("💰 Segment Revenue Contribution")
+
+@st.cache_resource(max_entries=2)
+def segment_revenue_figure(data_key, _segment_revenue):
+    return px.pie(
+        _segment_revenue,
+        names="Segment",
+        values="Monetary",
+        title="Revenue Contribution by Segment"
+    )
+
+fig_pie = segment_revenue_figure(data_key, segment_revenue)
+
+st.plotly_chart(fig_pie, use_container_width=True, key="seg_rev")
+
+# =====================================================
+# RFM SCATTER
+# =====================================================
+st.subheader("📈 RFM Scatter Analysis")
+
+# Orders are binned on a fixed grid so the chart payload does not grow with
+# the customer count; a capped sample of customers is drawn on top for hover.
+@st.cache_resource(max_entries=8)
+def rfm_density_figure(data_key, segment, _rfm, _rows):
+    recency = _rfm["Recency"].to_numpy()[_rows]
+    order_density, recency_edges, monetary_edges = np.histogram2d(
+        recency,
+        _rfm["Monetary"].to_numpy()[_rows],
+        bins=(50, 50),
+        weights=_rfm["Frequency"].to_numpy()[_rows]
+    )
+    sample_rows = np.random.RandomState(0).choice(
+        len(recency), min(2000, len(recency)), replace=False
+    )
+    scatter_sample = _rfm.iloc[_rows[sample_rows]]
+
+    fig = go.Figure(go.Heatmap(
+        x=(recency_edges[:-1] + recency_edges[1:]) / 2,
+        y=(monetary_edges[:-1] + monetary_edges[1:]) / 2,
+        z=np.where(order_density > 0, order_density, np.nan).T,
+        colorscale="Blues",
+        colorbar=dict(title="Orders"),
+        hovertemplate="Recency: %{x:.0f}<br>Monetary: %{y:,.0f}<br>Orders: %{z:.0f}<extra></extra>"
+    ))
+
+    fig.add_traces(px.scatter(
+        scatter_sample,
+        x="Recency",
+        y="Monetary",
+        size="Frequency",
+        color="Segment",
+        hover_data=["CustomerID"]
+    ).data)
+
+    fig.update_layout(
+        title="Recency vs Monetary (Shading = Orders, Bubble Size = Frequency)",
+        xaxis_title="Recency",
+        yaxis_title="Monetary",
+        legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+fig2 = rfm_density_figure(data_key, selected_segment, rfm, selected_rows)
+
+st.plotly_chart(fig2, use_container_width=True, key="rfm_density")
+
+# =====================================================
+# TOP CUSTOMERS
+# =====================================================
+st.subheader("🏆 Top 10 High-Value Customers")
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def compute_top_customers(data_key, segment, _rfm, _rows):
+    top_rows = _rfm["Monetary"].iloc[_rows].nlargest(10).index
+    return _rfm.loc[top_rows]
+
+top_customers = compute_top_customers(data_key, selected_segment, rfm, selected_rows)
+st.dataframe(top_customers, use_container_width=True)
+
+# =====================================================
+# AUTO BUSINESS INSIGHTS (Upgrade 3)
+# =====================================================
+st.subheader("🧠 Strategic Insights")
+
+st.markdown(f"""
+- Champions contribute **{insights['champions_percent']:.2f}%** of total revenue.
+- There are **{insights['at_risk_count']} customers** classified as At Risk.
+- Top 10 customers generate **{insights['top10_percent']:.2f}%** of total revenue.
+""")
+
+# =====================================================
+# DOWNLOAD
+# =====================================================
+# Keyed on the dataset and the filter selection rather than the frame
+# itself, so a rerun does not pay for hashing the rows it would encode.
+@st.cache_data(show_spinner=False, max_entries=4)
+def encode_csv(data_key, segment, _rfm, _rows):
+    buffer = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(_rfm.iloc[_rows], preserve_index=False), buffer)
+    return buffer.getvalue().to_pybytes()
+
+csv = encode_csv(data_key, selected_segment, rfm, selected_rows)
+
+st.download_button(
+    label="Download Filtered Data",
+    data=csv,
+    file_name="filtered_rfm.csv",
+    mime="text/csv"
+)
+
+st.markdown("---")
 st.markdown("Developed for Executive-Level Customer Intelligence & Data-Driven Decision Making")
\ No newline at end of file